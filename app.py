@@ -4,10 +4,21 @@
 
 from aiohttp import web
 from bootemup.config import config
-from bootemup.routes import info, start, stop, logs
-from bootemup.tasks import remove_obsolete, stop_inactive
+from bootemup.proxy import serve_proxy
+from bootemup.routes import info, start, stop, logs, bulk, export, processes
+from bootemup.tasks import (
+    collect_activity,
+    ingest_traefik,
+    refresh_index,
+    remove_obsolete,
+    stop_inactive,
+)
 
 
+# Client disconnections must cancel their handlers so that the docker
+# commands they spawned are killed: this is a server setting
+# (handler_cancellation), not an application one, so any other way of
+# serving `app` than `python app.py` has to enable it too
 app = web.Application()
 
 if config["server"]["disable_interface"]:
@@ -18,17 +29,28 @@ app.add_routes(
         web.get("/start/{name}", start),
         web.get("/start/{name}/boot", start),
         web.get("/stop/{name}", stop),
+        web.post("/bulk/{action}", bulk),
     ]
     + (
         [
             web.get("/", info),
             web.get("/logs/{name}", logs),
+            web.get("/logs/{name}/export", export),
+            web.get("/processes", processes),
         ]
         if not config["server"]["disable_interface"]
         else []
     )
 )
+if not config["server"]["disable_interface"]:
+    app.cleanup_ctx.append(refresh_index)
+if config["proxy"]["enabled"]:
+    app.cleanup_ctx.append(serve_proxy)
 if not config["server"]["disable_background_tasks"]:
+    if config["activity"]["enabled"]:
+        app.cleanup_ctx.append(collect_activity)
+    if config["traefik"]["enabled"]:
+        app.cleanup_ctx.append(ingest_traefik)
     app.cleanup_ctx.append(remove_obsolete)
     app.cleanup_ctx.append(stop_inactive)
 else:
@@ -36,4 +58,4 @@ else:
 
 
 if __name__ == "__main__":
-    web.run_app(app, port=1212)
+    web.run_app(app, port=1212, handler_cancellation=True)
@@ -0,0 +1,37 @@
+# Copyright 2025 Akretion (http://www.akretion.com).
+# @author Florian Mounier <florian.mounier@akretion.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+import re
+from datetime import datetime, UTC
+
+from .config import config
+
+
+class AccessTable:
+    """Last access of each project, as observed by bootemup itself"""
+
+    def __init__(self):
+        self.accesses = {}
+        self.exclude_urls = [
+            re.compile(rex) for rex in config["stop_inactive"]["exclude_urls"]
+        ]
+
+    def excluded(self, url):
+        return any(rex.match(url) for rex in self.exclude_urls)
+
+    def touch(self, name, when=None, url=None):
+        """Record an access, return False if it was ignored"""
+        if url is not None and self.excluded(url):
+            return False
+        when = when or datetime.now(UTC)
+        previous = self.accesses.get(name)
+        if previous is None or when >= previous[0]:
+            self.accesses[name] = (when, url)
+        return True
+
+    def get(self, name):
+        """Return (last access, last url) or (None, None)"""
+        return self.accesses.get(name, (None, None))
+
+
+last_accesses = AccessTable()
@@ -0,0 +1,123 @@
+# Copyright 2025 Akretion (http://www.akretion.com).
+# @author Florian Mounier <florian.mounier@akretion.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+import pathlib
+from datetime import datetime, UTC
+
+from .config import config
+
+
+def cgroup(container_id):
+    for path in config["activity"]["cgroup_paths"]:
+        path = pathlib.Path(path.format(id=container_id))
+        if path.is_dir():
+            return path
+
+
+def read_counters(container_id):
+    """Return cumulated (cpu seconds, network bytes, block I/O bytes)"""
+    path = cgroup(container_id)
+    if path is None:
+        return None
+
+    try:
+        cpu_stat = (path / "cpu.stat").read_text()
+        io_stat = (path / "io.stat").read_text()
+        pids = (path / "cgroup.procs").read_text().split()
+    except OSError:
+        # The container stopped between the cgroup lookup and the reads
+        return None
+
+    cpu = net = io = 0
+    for line in cpu_stat.splitlines():
+        key, _, value = line.partition(" ")
+        if key == "usage_usec":
+            cpu = int(value) / 1e6
+            break
+
+    for line in io_stat.splitlines():
+        for field in line.split()[1:]:
+            key, _, value = field.partition("=")
+            if key in ("rbytes", "wbytes"):
+                io += int(value)
+
+    # Network counters are per namespace, read them through one of the
+    # container processes
+    if pids:
+        try:
+            lines = pathlib.Path(f"/proc/{pids[0]}/net/dev").read_text()
+        except OSError:
+            lines = ""
+        for line in lines.splitlines()[2:]:
+            interface, _, values = line.partition(":")
+            if interface.strip() == "lo":
+                continue
+            values = values.split()
+            net += int(values[0]) + int(values[8])
+
+    return cpu, net, io
+
+
+def thresholds(container):
+    settings = config["activity"]
+    values = {
+        f"{key}_threshold": settings[f"{key}_threshold"] for key in ("cpu", "net", "io")
+    }
+    for selector, overrides in settings.get("labels", {}).items():
+        if container.has_label(selector):
+            values.update(overrides)
+    return values
+
+
+class Collector:
+    """Track the last time each project used CPU, network or disk"""
+
+    def __init__(self):
+        self.samples = {}
+        self.rates = {}
+        self.last_active = {}
+
+    def sample(self, containers, now=None):
+        """Sample running projects, return the ones found active"""
+        now = now or datetime.now(UTC)
+        active = []
+        samples = {}
+        for container in containers:
+            if "running" not in container.status:
+                continue
+
+            counters = [
+                read_counters(image["id"])
+                for image in container.images
+                if image["state"] == "running"
+            ]
+            counters = [counter for counter in counters if counter is not None]
+            if not counters:
+                continue
+            samples[container.name] = (now, *map(sum, zip(*counters)))
+
+            previous = self.samples.get(container.name)
+            if previous is None:
+                continue
+            elapsed = (now - previous[0]).total_seconds()
+            deltas = [
+                current - last
+                for current, last in zip(samples[container.name][1:], previous[1:])
+            ]
+            if elapsed <= 0 or any(delta < 0 for delta in deltas):
+                # A container has been restarted, its counters were reset
+                continue
+
+            rates = dict(zip(("cpu", "net", "io"), (d / elapsed for d in deltas)))
+            self.rates[container.name] = rates
+            limits = thresholds(container)
+            if any(rates[key] > limits[f"{key}_threshold"] for key in rates):
+                self.last_active[container.name] = now
+                active.append(container.name)
+
+        # Forget projects which are not running anymore
+        self.samples = samples
+        for name in list(self.rates):
+            if name not in samples:
+                del self.rates[name]
+        return active
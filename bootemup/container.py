@@ -4,14 +4,27 @@
 from asyncio import gather
 import json
 import re
-from asyncio.subprocess import create_subprocess_exec, PIPE, STDOUT
 from datetime import datetime, UTC
 from collections import defaultdict
+from urllib.parse import urlsplit
 
-from .utils import run
+from .utils import executor, run
 from .config import config
 
 
+line_re = re.compile(
+    r"(?P<service>.*?)\s*\| (?P<timestamp>(:?\d|-)+ (:?\d|-|:)+)(?:,\d+)? \d+ .+"
+)
+access_re = re.compile(
+    r".*\| (?P<timestamp>(:?\d|-)+ (:?\d|-|:)+)(?:,\d+)? \d+ .+ "
+    r'"(GET|POST|PUT|DELETE) (?P<url>\S+) HTTP.*'
+)
+startup_re = re.compile(
+    r".*\| (?P<timestamp>(:?\d|-)+ (:?\d|-|:)+)(?:,\d+)? \d+ .+ "
+    r"running on (?P<url>\S+).*"
+)
+
+
 async def get_containers():
     compose_out, docker_out = await gather(
         run(
@@ -77,6 +90,30 @@ async def get_containers():
     ]
 
 
+def url_routes(containers):
+    """Return (hostname, path, name) of each project url, longest paths first"""
+    routes = []
+    for container in containers:
+        try:
+            url = urlsplit(container.url)
+        except ValueError:
+            continue
+        routes.append(
+            ((url.hostname or "").lower(), url.path.rstrip("/"), container.name)
+        )
+    routes.sort(key=lambda route: len(route[1]), reverse=True)
+    return routes
+
+
+def match_route(routes, host, path="/"):
+    host = (host or "").rsplit(":", 1)[0].lower()
+    for hostname, prefix, name in routes:
+        if hostname == host and (
+            not prefix or path == prefix or path.startswith(prefix + "/")
+        ):
+            return name
+
+
 class Container:
     @staticmethod
     async def get(name):
@@ -165,7 +202,8 @@ class Container:
     async def logs(self, break_on=None, tail=None):
         break_on = break_on or {}
         tail_params = ["--tail", str(tail)] if tail else []
-        process = await create_subprocess_exec(
+        # Followers run until the client goes away, hence no deadline
+        async with executor.spawn(
             "docker",
             "compose",
             "-p",
@@ -173,37 +211,54 @@ class Container:
             "logs",
             *tail_params,
             "-f",
-            stdout=PIPE,
-            stderr=STDOUT,
-        )
-        backlog = ""
-        while True:
-            stdout = await process.stdout.read(256)
-            if stdout:
-                yield stdout
-                backlog += stdout.decode("utf-8")
-
-                for break_, raise_ in break_on.items():
-                    if break_ in backlog:
-                        process.terminate()
-                        if raise_:
-                            raise ValueError("Errored")
-                        return
-            else:
-                if process.returncode is not None and process.returncode != 0:
-                    raise ValueError(f"Exited with code {process.returncode}")
-                break
+            follow=True,
+        ) as command:
+            process = command.process
+            backlog = ""
+            while True:
+                stdout = await process.stdout.read(256)
+                if stdout:
+                    yield stdout
+                    backlog += stdout.decode("utf-8")
+
+                    for break_, raise_ in break_on.items():
+                        if break_ in backlog:
+                            if raise_:
+                                raise ValueError("Errored")
+                            return
+                else:
+                    await process.wait()
+                    if process.returncode != 0:
+                        raise ValueError(f"Exited with code {process.returncode}")
+                    break
         return
 
+    async def export_logs(self, tail=None, since=None, until=None):
+        params = ["--no-color"]
+        if tail is not None:
+            params += ["--tail", str(tail)]
+        if since:
+            params += ["--since", since]
+        if until:
+            params += ["--until", until]
+        async with executor.spawn(
+            "docker",
+            "compose",
+            "-p",
+            self.name,
+            "logs",
+            *params,
+            # Paced by the client download, like followers: no deadline
+            follow=True,
+        ) as command:
+            process = command.process
+            while stdout := await process.stdout.read(65536):
+                yield stdout
+            await process.wait()
+            if process.returncode != 0:
+                raise ValueError(f"Exited with code {process.returncode}")
+
     async def get_last_access(self):
-        access_re = re.compile(
-            r".*\| (?P<timestamp>(:?\d|-)+ (:?\d|-|:)+)(?:,\d+)? \d+ .+ "
-            r'"(GET|POST|PUT|DELETE) (?P<url>\S+) HTTP.*'
-        )
-        startup_re = re.compile(
-            r".*\| (?P<timestamp>(:?\d|-)+ (:?\d|-|:)+)(?:,\d+)? \d+ .+ "
-            r"running on (?P<url>\S+).*"
-        )
         exclude_urls = [
             re.compile(rex) for rex in config["stop_inactive"]["exclude_urls"]
         ]
@@ -253,6 +308,14 @@ class Container:
                 self.last_activity = "running"
                 return
 
+    def has_label(self, selector):
+        """Whether an image has the `label` or `label=value` selector"""
+        key, _, value = selector.partition("=")
+        return any(
+            key in image["labels"] and (not value or image["labels"][key] == value)
+            for image in self.images
+        )
+
     @property
     def has_stop_inactive_label(self):
         label = config["stop_inactive"]["label"]
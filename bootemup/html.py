@@ -7,6 +7,7 @@ from contextlib import asynccontextmanager
 from asyncio import sleep
 from inspect import cleandoc as dedent
 from datetime import datetime
+from html import escape
 
 from .config import config
 
@@ -44,13 +45,13 @@ class Html:
         await response.prepare(self.request)
         self.response = response
 
-    async def __tag__(self, name, state, *args, **kwargs):
+    async def __tag__(self, name, state, /, *args, **kwargs):
         if state == "close":
             await self(f"</{name}>")
             return
 
         attrs = " ".join(k for k in args)
-        kwattrs = " ".join(f'{k}="{v}"' for k, v in kwargs.items())
+        kwattrs = " ".join(f'{k}="{escape(str(v))}"' for k, v in kwargs.items())
         tag = " ".join(s for s in (name, attrs, kwattrs) if s)
 
         if state == "self-closing":
@@ -104,7 +105,7 @@ class Html:
     async def maybe(self, value, no_interface):
         if no_interface:
             # Log to console when interface is disabled
-            print(">", value.decode("utf-8"))
+            print(">", value.decode("utf-8") if isinstance(value, bytes) else value)
 
         await self(no_interface if config["server"]["disable_interface"] else value)
 
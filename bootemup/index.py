@@ -0,0 +1,144 @@
+# Copyright 2025 Akretion (http://www.akretion.com).
+# @author Florian Mounier <florian.mounier@akretion.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+from asyncio import Semaphore, create_task, gather
+from datetime import datetime, UTC
+from traceback import print_exc
+
+from .access import last_accesses
+from .config import config
+from .container import get_containers
+
+oldest = datetime.min.replace(tzinfo=UTC)
+newest = datetime.max.replace(tzinfo=UTC)
+
+
+def sort_keys(container):
+    return {
+        "name": container.name,
+        "status": container.status,
+        "last_access": container.last_access
+        if isinstance(container.last_access, datetime)
+        else oldest,
+        "last_activity": newest
+        if container.last_activity == "running"
+        else container.last_activity or oldest,
+    }
+
+
+class Index:
+    """In-memory inventory of projects and of their last access/activity
+
+    Both are refreshed on demand, when the dashboard is viewed: the inventory
+    once it is older than `refresh_interval` and the details of a shown row
+    once they are older than `details_interval`.
+    """
+
+    def __init__(self):
+        self.containers = {}
+        self.computed = {}
+        self.computing = {}
+        self.refreshed = None
+        self.refreshing = None
+        self.semaphore = Semaphore(config["index"]["concurrency"])
+
+    @property
+    def stale(self):
+        return (
+            self.refreshed is None
+            or (datetime.now(UTC) - self.refreshed).total_seconds()
+            >= config["index"]["refresh_interval"]
+        )
+
+    def refresh_inventory(self):
+        """Refresh the project list, at most once at a time"""
+        if self.refreshing is None:
+            self.refreshing = create_task(self._refresh_inventory())
+        return self.refreshing
+
+    async def _refresh_inventory(self):
+        try:
+            containers = {}
+            for container in await get_containers():
+                previous = self.containers.get(container.name)
+                if previous is not None:
+                    # Keep showing the previous values until they are recomputed
+                    container.last_access = previous.last_access
+                    container.last_url = previous.last_url
+                    if previous.status == container.status:
+                        container.last_activity = previous.last_activity
+                    else:
+                        self.computed.pop(container.name, None)
+                last_access, last_url = last_accesses.get(container.name)
+                if last_access is not None and (
+                    not isinstance(container.last_access, datetime)
+                    or last_access > container.last_access
+                ):
+                    container.last_access, container.last_url = last_access, last_url
+                containers[container.name] = container
+            self.computed = {
+                name: when for name, when in self.computed.items() if name in containers
+            }
+            self.containers = containers
+            self.refreshed = datetime.now(UTC)
+        except Exception:
+            # Keep serving the previous list
+            print("Error while refreshing the dashboard index:")
+            print_exc()
+        finally:
+            self.refreshing = None
+
+    def outdated(self, name):
+        computed = self.computed.get(name)
+        return (
+            computed is None
+            or (datetime.now(UTC) - computed).total_seconds()
+            >= config["index"]["details_interval"]
+        )
+
+    def compute(self, name):
+        """Compute last access and activity of `name`, at most once at a time"""
+        if name not in self.computing:
+            self.computing[name] = create_task(self._compute(name))
+        return self.computing[name]
+
+    async def _last_access(self, container):
+        last_access, last_url = last_accesses.get(container.name)
+        if last_access is not None:
+            # Known from bootemup own records, no need to read the logs
+            container.last_access, container.last_url = last_access, last_url
+            return
+        await container.get_last_access()
+
+    async def _compute(self, name):
+        try:
+            async with self.semaphore:
+                container = self.containers[name]
+                # Start from scratch, get_last_activity keeps the latest value
+                container.last_activity = None
+                await gather(
+                    self._last_access(container), container.get_last_activity()
+                )
+                current = self.containers.get(name)
+                if current is not None and current is not container:
+                    # The inventory has been refreshed in the meantime
+                    current.last_access = container.last_access
+                    current.last_url = container.last_url
+                    current.last_activity = container.last_activity
+                self.computed[name] = datetime.now(UTC)
+                return container
+        finally:
+            del self.computing[name]
+
+    def search(self, query="", sort="name", reverse=False):
+        query = query.lower()
+        containers = [
+            container
+            for container in self.containers.values()
+            if query in container.name.lower()
+        ]
+        containers.sort(
+            key=lambda container: (sort_keys(container)[sort], container.name),
+            reverse=reverse,
+        )
+        return containers
@@ -0,0 +1,63 @@
+# Copyright 2025 Akretion (http://www.akretion.com).
+# @author Florian Mounier <florian.mounier@akretion.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+import pathlib
+
+from .activity import cgroup
+from .config import config
+
+
+def available():
+    """Return the host MemAvailable in bytes"""
+    for line in pathlib.Path("/proc/meminfo").read_text().splitlines():
+        key, _, value = line.partition(":")
+        if key == "MemAvailable":
+            return int(value.split()[0]) * 1024
+
+
+def pressure():
+    """Return the memory PSI "some avg10" percentage, None if unsupported"""
+    try:
+        lines = pathlib.Path("/proc/pressure/memory").read_text()
+    except OSError:
+        return None
+    for line in lines.splitlines():
+        kind, *fields = line.split()
+        if kind == "some":
+            for field in fields:
+                key, _, value = field.partition("=")
+                if key == "avg10":
+                    return float(value)
+
+
+def usage(container):
+    """Return the memory used by the running containers of a project"""
+    total = 0
+    for image in container.images:
+        if image["state"] != "running":
+            continue
+        path = cgroup(image["id"])
+        if path is None:
+            continue
+        try:
+            total += int((path / "memory.current").read_text())
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+class Memory:
+    """Snapshot of the host memory state"""
+
+    def __init__(self):
+        settings = config["memory"]
+        self.available = available()
+        self.pressure = pressure()
+        self.missing = max(0, settings["min_available"] - self.available)
+        self.under_pressure = bool(self.missing) or (
+            self.pressure is not None and self.pressure > settings["max_pressure"]
+        )
+        self.plentiful = (
+            not self.under_pressure
+            and self.available >= settings["plentiful_available"]
+        )
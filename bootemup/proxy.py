@@ -0,0 +1,254 @@
+# Copyright 2025 Akretion (http://www.akretion.com).
+# @author Florian Mounier <florian.mounier@akretion.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+from asyncio import (
+    FIRST_COMPLETED,
+    TimeoutError,
+    create_task,
+    gather,
+    shield,
+    sleep,
+    wait,
+    wait_for,
+)
+from contextlib import aclosing
+from datetime import datetime, UTC
+from urllib.parse import urlsplit
+
+from aiohttp import ClientSession, TCPConnector, WSMsgType, web
+from aiohttp.web import AppKey
+from multidict import CIMultiDict
+from yarl import URL
+
+from .config import config
+from .container import get_containers, match_route, url_routes
+from .tasks.stop_inactive import touch
+
+hop_by_hop = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+}
+# Answers of the front server while the project is not reachable yet. Routes
+# are known once the containers are started, so a 404 is the project's own
+not_ready = {502, 503, 504}
+
+
+def forward_headers(headers, skip=()):
+    # Keep repeated headers, i.e. Set-Cookie
+    return CIMultiDict(
+        (key, value)
+        for key, value in headers.items()
+        if key.lower() not in hop_by_hop and key.lower() not in skip
+    )
+
+
+class Proxy:
+    """Route requests to projects by Host, starting stopped ones on the fly"""
+
+    def __init__(self, app):
+        self.app = app
+        self.upstream = URL(config["proxy"]["upstream"])
+        self.session = None
+        self.containers = {}
+        self.routes = []
+        self.refreshed = None
+        self.refreshing = None
+        self.boots = {}
+
+    async def open(self):
+        # Bodies are passed through untouched, compressed or not
+        self.session = ClientSession(
+            connector=TCPConnector(limit=config["proxy"]["connections"]),
+            auto_decompress=False,
+        )
+
+    async def close(self):
+        for task in self.boots.values():
+            task.cancel()
+        await self.session.close()
+
+    async def _refresh(self):
+        try:
+            containers = {
+                container.name: container for container in await get_containers()
+            }
+            routes = url_routes(containers.values())
+            self.containers, self.routes = containers, routes
+            self.refreshed = datetime.now(UTC)
+        finally:
+            self.refreshing = None
+
+    async def refresh(self, force=False):
+        if (
+            not force
+            and self.refreshed is not None
+            and (datetime.now(UTC) - self.refreshed).total_seconds()
+            < config["proxy"]["refresh_interval"]
+        ):
+            return
+        if self.refreshing is None:
+            self.refreshing = create_task(self._refresh())
+        await shield(self.refreshing)
+
+    def resolve(self, request):
+        name = match_route(self.routes, request.host, request.path)
+        if name is not None:
+            return self.containers[name]
+
+    async def _start(self, container):
+        # The cached status may be outdated, i.e. started through /start
+        await self.refresh(force=True)
+        container = self.containers.get(container.name, container)
+        if "running" not in container.status:
+            print(f"Starting {container.name} on request")
+            await container.start()
+            # A running server doesn't log its startup again, only follow the
+            # logs of a stopped one
+            async with aclosing(
+                container.logs(
+                    break_on={"running on": False, "exited with code": True}, tail=1
+                )
+            ) as logs:
+                async for _ in logs:
+                    pass
+            container.status = "running"
+
+        # Then wait for the front server to route to it
+        while True:
+            async with self.session.get(
+                self.upstream.join(URL(urlsplit(container.url).path or "/")),
+                headers={"Host": urlsplit(container.url).netloc},
+                allow_redirects=False,
+            ) as response:
+                if response.status not in not_ready:
+                    return
+            await sleep(0.25)
+
+    async def _boot(self, container):
+        try:
+            # Give up on stacks that never come up, the next request retries
+            await wait_for(self._start(container), config["proxy"]["boot_timeout"])
+        finally:
+            del self.boots[container.name]
+
+    async def ready(self, container):
+        """Start `container` if needed and hold until it answers"""
+        if "running" in container.status:
+            return
+        if container.name not in self.boots:
+            self.boots[container.name] = create_task(self._boot(container))
+        # Shielded so that a disconnecting client doesn't abort the boot of others
+        await shield(self.boots[container.name])
+
+    async def handle(self, request):
+        await self.refresh()
+        container = self.resolve(request)
+        if container is None:
+            # Maybe a new project
+            await self.refresh(force=True)
+            container = self.resolve(request)
+        if container is None:
+            raise web.HTTPNotFound(text=f"No project found for {request.host}")
+
+        touch(self.app, container.name, url=request.path)
+
+        try:
+            await self.ready(container)
+        except TimeoutError:
+            raise web.HTTPGatewayTimeout(text=f"{container.name} is still booting")
+        except Exception as e:
+            raise web.HTTPBadGateway(text=f"Can't start {container.name}: {e}")
+
+        url = self.upstream.join(request.rel_url)
+        headers = forward_headers(request.headers)
+        headers["X-Forwarded-For"] = ", ".join(
+            filter(None, (request.headers.get("X-Forwarded-For"), request.remote))
+        )
+        headers.setdefault("X-Forwarded-Host", request.host)
+        headers.setdefault("X-Forwarded-Proto", request.scheme)
+
+        if request.headers.get("Upgrade", "").lower() == "websocket":
+            return await self.websocket(request, url, headers)
+
+        async with self.session.request(
+            request.method,
+            url,
+            headers=headers,
+            # Stream the request body as it comes
+            data=request.content if request.body_exists else None,
+            allow_redirects=False,
+        ) as upstream:
+            response = web.StreamResponse(
+                status=upstream.status,
+                reason=upstream.reason,
+                headers=forward_headers(upstream.headers),
+            )
+            await response.prepare(request)
+            # Relay chunks as they arrive, without buffering them
+            async for chunk in upstream.content.iter_any():
+                await response.write(chunk)
+            await response.write_eof()
+            return response
+
+    async def websocket(self, request, url, headers):
+        server = web.WebSocketResponse()
+        await server.prepare(request)
+        async with self.session.ws_connect(
+            url,
+            headers=forward_headers(
+                headers,
+                skip=(
+                    "sec-websocket-key",
+                    "sec-websocket-version",
+                    "sec-websocket-extensions",
+                ),
+            ),
+        ) as client:
+
+            async def pipe(source, target):
+                async for message in source:
+                    if message.type == WSMsgType.TEXT:
+                        await target.send_str(message.data)
+                    elif message.type == WSMsgType.BINARY:
+                        await target.send_bytes(message.data)
+                    else:
+                        break
+
+            tasks = [
+                create_task(pipe(server, client)),
+                create_task(pipe(client, server)),
+            ]
+            await wait(tasks, return_when=FIRST_COMPLETED)
+            for task in tasks:
+                task.cancel()
+            await gather(*tasks, return_exceptions=True)
+        await server.close()
+        return server
+
+
+proxy_server = AppKey("proxy_server", Proxy)
+
+
+async def serve_proxy(app):
+    proxy = Proxy(app)
+    await proxy.open()
+    proxy_app = web.Application()
+    proxy_app.router.add_route("*", "/{path:.*}", proxy.handle)
+    runner = web.AppRunner(proxy_app, handler_cancellation=True)
+    await runner.setup()
+    site = web.TCPSite(runner, config["proxy"]["host"], config["proxy"]["port"])
+    await site.start()
+    print(f"Proxying {site.name} to {config['proxy']['upstream']}")
+    app[proxy_server] = proxy
+
+    yield
+
+    await runner.cleanup()
+    await proxy.close()
@@ -6,3 +6,6 @@ from .start import start as start
 from .stop import stop as stop
 from .info import info as info
 from .logs import logs as logs
+from .bulk import bulk as bulk
+from .export import export as export
+from .processes import processes as processes
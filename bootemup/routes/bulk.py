@@ -0,0 +1,138 @@
+# Copyright 2025 Akretion (http://www.akretion.com).
+# @author Florian Mounier <florian.mounier@akretion.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+import json
+from asyncio import Queue, Semaphore, gather
+from fnmatch import fnmatchcase
+
+from aiohttp import web
+from multidict import MultiDict
+
+from ..config import config
+from ..container import get_containers
+from ..tasks.stop_inactive import touch
+
+
+async def _start(request, container):
+    touch(request.app, container.name)
+    return await container.start()
+
+
+async def _boot(request, container):
+    touch(request.app, container.name)
+    await container.kill()
+    return await container.boot()
+
+
+async def _stop(request, container):
+    return await container.stop()
+
+
+async def _rm(request, container):
+    return await container.rm()
+
+
+actions = {"start": _start, "boot": _boot, "stop": _stop, "rm": _rm}
+
+
+def selected(container, patterns, labels, statuses):
+    if patterns and not any(fnmatchcase(container.name, p) for p in patterns):
+        return False
+    if statuses and not any(status in container.status for status in statuses):
+        return False
+    if not all(container.has_label(label) for label in labels):
+        return False
+    return True
+
+
+async def bulk(request):
+    action = actions.get(request.match_info.get("action"))
+    if action is None:
+        raise web.HTTPNotFound(text=f"Unknown action, use one of {', '.join(actions)}")
+
+    # Selectors can be given in the query string or as form fields
+    params = MultiDict(request.query)
+    params.extend(await request.post())
+    patterns = params.getall("pattern", [])
+    labels = params.getall("label", [])
+    statuses = params.getall("status", [])
+    if not (patterns or labels or statuses):
+        raise web.HTTPBadRequest(
+            text="At least one pattern, label or status selector is required"
+        )
+    try:
+        concurrency = int(params.get("concurrency", config["bulk"]["concurrency"]))
+    except ValueError:
+        raise web.HTTPBadRequest(text="concurrency must be an integer")
+
+    # Resolve the whole selection from a single inventory snapshot
+    containers = [
+        container
+        for container in await get_containers()
+        if selected(container, patterns, labels, statuses)
+    ]
+
+    response = web.StreamResponse(
+        status=200,
+        headers={
+            "Content-Type": "application/x-ndjson",
+            "Cache-Control": "no-cache",
+        },
+    )
+    await response.prepare(request)
+
+    async def write(event):
+        await response.write(json.dumps(event).encode("utf-8") + b"\n")
+
+    await write(
+        {
+            "event": "selected",
+            "action": request.match_info["action"],
+            "projects": [container.name for container in containers],
+        }
+    )
+
+    # Workers report through a queue so that a single writer owns the response
+    events = Queue()
+    semaphore = Semaphore(max(1, concurrency))
+
+    async def worker(container):
+        async with semaphore:
+            events.put_nowait({"event": "running", "project": container.name})
+            try:
+                output = await action(request, container)
+            except Exception as e:
+                events.put_nowait(
+                    {
+                        "event": "done",
+                        "project": container.name,
+                        "ok": False,
+                        "error": str(e),
+                    }
+                )
+            else:
+                events.put_nowait(
+                    {
+                        "event": "done",
+                        "project": container.name,
+                        "ok": output.returncode == 0,
+                        "returncode": output.returncode,
+                        "output": output.decode("utf-8", errors="replace"),
+                    }
+                )
+
+    tasks = gather(*(worker(container) for container in containers))
+    results = {True: 0, False: 0}
+    try:
+        for _ in range(len(containers) * 2):
+            event = await events.get()
+            if event["event"] == "done":
+                results[event["ok"]] += 1
+            await write(event)
+        await tasks
+    finally:
+        tasks.cancel()
+
+    await write({"event": "finished", "ok": results[True], "failed": results[False]})
+    await response.write_eof()
+    return response
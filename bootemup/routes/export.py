@@ -0,0 +1,152 @@
+# Copyright 2025 Akretion (http://www.akretion.com).
+# @author Florian Mounier <florian.mounier@akretion.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+import zlib
+from contextlib import aclosing
+
+from aiohttp import web
+
+from ..container import Container
+
+try:
+    from compression import zstd  # Python >= 3.14
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+
+def gzip_encoder():
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    return compressor.compress, compressor.flush
+
+
+def zstd_encoder():
+    compressor = zstd.ZstdCompressor()
+    if hasattr(compressor, "compressobj"):
+        # zstandard package
+        compressor = compressor.compressobj()
+    return compressor.compress, compressor.flush
+
+
+encoders = {"gzip": gzip_encoder}
+if zstd is not None:
+    encoders = {"zstd": zstd_encoder, **encoders}
+
+
+def negotiate(accept_encoding):
+    """Return the preferred available encoding, or None for identity"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        if coding:
+            weights[coding] = q
+
+    best, best_q = None, 0
+    for coding in encoders:
+        q = weights.get(coding, weights.get("*", 0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+async def paginate(chunks, offset, limit):
+    """Skip `offset` lines then yield at most `limit` lines of `chunks`"""
+    async for chunk in chunks:
+        # Skipped lines may span several chunks
+        start = 0
+        while offset and start < len(chunk):
+            newline = chunk.find(b"\n", start)
+            if newline < 0:
+                start = len(chunk)
+                break
+            start = newline + 1
+            offset -= 1
+        chunk = chunk[start:]
+
+        if limit is not None:
+            lines = chunk.count(b"\n")
+            if lines >= limit:
+                end = -1
+                for _ in range(limit):
+                    end = chunk.find(b"\n", end + 1)
+                if end >= 0:
+                    yield chunk[: end + 1]
+                return
+            limit -= lines
+
+        if chunk:
+            yield chunk
+
+
+def int_param(request, key, minimum):
+    value = request.query.get(key)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        value = minimum - 1
+    if value < minimum:
+        raise web.HTTPBadRequest(text=f"{key} must be an integer >= {minimum}")
+    return value
+
+
+async def export(request):
+    name = request.match_info.get("name")
+    tail = int_param(request, "tail", 0)
+    offset = int_param(request, "offset", 0) or 0
+    limit = int_param(request, "limit", 1)
+    try:
+        container = await Container.get(name)
+    except ValueError as e:
+        raise web.HTTPNotFound(text=str(e))
+
+    encoding = negotiate(request.headers.get("Accept-Encoding", ""))
+    headers = {
+        "Content-Type": "text/plain; charset=utf-8",
+        "Content-Disposition": f'attachment; filename="{name}.log"',
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        compress, flush = encoders[encoding]()
+    else:
+        compress, flush = (lambda data: data), bytes
+
+    response = web.StreamResponse(status=200, headers=headers)
+    await response.prepare(request)
+
+    async def write(data):
+        data = compress(data)
+        if data:
+            await response.write(data)
+
+    async with aclosing(
+        container.export_logs(
+            tail=tail,
+            since=request.query.get("since"),
+            until=request.query.get("until"),
+        )
+    ) as logs:
+        try:
+            async for chunk in paginate(logs, offset, limit):
+                await write(chunk)
+        except ValueError as e:
+            await write(f"\n{e}\n".encode("utf-8"))
+
+    data = flush()
+    if data:
+        await response.write(data)
+    await response.write_eof()
+    return response
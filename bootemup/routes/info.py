@@ -1,25 +1,94 @@
 # Copyright 2025 Akretion (http://www.akretion.com).
 # @author Florian Mounier <florian.mounier@akretion.com>
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
-from asyncio import gather
+import json
+from asyncio import as_completed
+from datetime import datetime
+from urllib.parse import urlencode
 
-from ..container import get_containers
 from ..html import Html
+from ..tasks.refresh_index import dashboard_index
+
+sorts = ("name", "status", "last_access", "last_activity")
+details = ("last_activity", "last_access", "last_url")
+
+
+def text(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value)
+
+
+def js(value):
+    """JSON for an inline script, which must not close its <script> tag"""
+    return json.dumps(value).replace("<", "\\u003c")
+
+
+def int_param(request, key, default):
+    try:
+        return max(1, int(request.query.get(key, default)))
+    except ValueError:
+        return default
 
 
 async def info(request):
+    index = request.app[dashboard_index]
+    if index.refreshed is None:
+        await index.refresh_inventory()
+    elif index.stale:
+        # Serve the current list, the next views get the refreshed one
+        index.refresh_inventory()
+
+    query = request.query.get("q", "")
+    sort = request.query.get("sort", "name")
+    if sort not in sorts:
+        sort = "name"
+    order = "desc" if request.query.get("order") == "desc" else "asc"
+    per_page = min(int_param(request, "per_page", 50), 500)
+
+    containers = index.search(query, sort, reverse=order == "desc")
+    pages = max(1, -(-len(containers) // per_page))
+    page = min(int_param(request, "page", 1), pages)
+    containers = containers[(page - 1) * per_page : page * per_page]
+
+    def url(**params):
+        params = {
+            "q": query,
+            "sort": sort,
+            "order": order,
+            "page": page,
+            "per_page": per_page,
+            **params,
+        }
+        return "/?" + urlencode({key: value for key, value in params.items() if value})
+
     html = Html(request)
     await html._init_()
 
     async with html._page_():
-        containers = await get_containers()
+        async with html.form(method="get", action="/"):
+            await html.input(type="search", name="q", value=query, placeholder="Search")
+            await html.input(type="hidden", name="sort", value=sort)
+            await html.input(type="hidden", name="order", value=order)
+            await html.input(type="hidden", name="per_page", value=per_page)
 
         async with html.table():
-            keys = ("name", "status")
+            keys = ("name", "status", "flags", *details)
             async with html.thead():
                 for key in keys:
                     async with html.th():
-                        await html(key)
+                        if key in sorts:
+                            reverse = (
+                                "asc" if sort == key and order == "desc" else "desc"
+                            )
+                            async with html.a(
+                                href=url(sort=key, order=reverse, page=1)
+                            ):
+                                await html(key)
+                        else:
+                            await html(key)
                 async with html.th():
                     await html("actions")
 
@@ -27,9 +96,14 @@ async def info(request):
                 for container in containers:
                     async with html.tr():
                         for key in keys:
-                            value = getattr(container, key)
-                            async with html.td():
-                                await html(value)
+                            async with html.td(id=f"{container.name}-{key}"):
+                                if (
+                                    key in details
+                                    and container.name not in index.computed
+                                ):
+                                    await html("…")
+                                else:
+                                    await html(getattr(container, key))
 
                         async with html.td():
                             link = "margin: 0 0.25em;"
@@ -50,24 +124,34 @@ async def info(request):
                                 ):
                                     await html("Stop")
 
-        async with html.table():
-            keys = ("name", "flags", "last_activity", "last_access", "last_url")
-            async with html.thead():
-                for key in keys:
-                    async with html.th():
-                        await html(key)
+        async with html.nav():
+            if page > 1:
+                async with html.a(href=url(page=page - 1)):
+                    await html("Previous")
+            await html(f" Page {page} / {pages} ")
+            if page < pages:
+                async with html.a(href=url(page=page + 1)):
+                    await html("Next")
+            async with html.a(style="float: right;", href="/processes"):
+                await html("Processes")
 
-            async with html.tbody():
-                for container in containers:
-                    await gather(
-                        container.get_last_access(),
-                        container.get_last_activity(),
+        # Fill in the shown rows which were not computed lately as they come
+        pending = [
+            index.compute(container.name)
+            for container in containers
+            if index.outdated(container.name)
+        ]
+        for task in as_completed(pending):
+            try:
+                container = await task
+            except Exception:
+                continue
+            async with html.script():
+                for key in details:
+                    cell = js(f"{container.name}-{key}")
+                    value = js(text(getattr(container, key)))
+                    await html(
+                        f"document.getElementById({cell}).textContent = {value};"
                     )
 
-                    async with html.tr():
-                        for key in keys:
-                            value = getattr(container, key)
-                            async with html.td():
-                                await html(value)
-
     return html.response
@@ -2,6 +2,8 @@
 # @author Florian Mounier <florian.mounier@akretion.com>
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
+from contextlib import aclosing
+
 from ..container import Container
 from ..html import Html
 
@@ -20,8 +22,9 @@ async def logs(request):
                 return html.response
 
             try:
-                async for log in container.logs():
-                    await html(log)
+                async with aclosing(container.logs()) as logs:
+                    async for log in logs:
+                        await html(log)
             except Exception as e:
                 await html(str(e))
                 return html.response
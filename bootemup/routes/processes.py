@@ -0,0 +1,33 @@
+# Copyright 2025 Akretion (http://www.akretion.com).
+# @author Florian Mounier <florian.mounier@akretion.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+from ..html import Html
+from ..utils import executor
+
+
+async def processes(request):
+    html = Html(request)
+    await html._init_()
+
+    async with html._page_(full_width=True):
+        async with html.table():
+            keys = ("pid", "command", "age", "timeout")
+            async with html.thead():
+                for key in keys:
+                    async with html.th():
+                        await html(key)
+
+            async with html.tbody():
+                for command in list(executor.commands.values()):
+                    async with html.tr():
+                        for value in (
+                            str(command.pid),
+                            str(command),
+                            f"{command.age:.0f}s",
+                            f"{command.timeout}s" if command.timeout else "none",
+                        ):
+                            async with html.td():
+                                await html(value)
+
+    return html.response
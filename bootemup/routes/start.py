@@ -2,8 +2,11 @@
 # @author Florian Mounier <florian.mounier@akretion.com>
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
+from contextlib import aclosing
+
 from ..container import Container
 from ..html import Html
+from ..tasks.stop_inactive import touch
 
 
 async def start(request):
@@ -19,20 +22,42 @@ async def start(request):
                 await html(str(e))
                 return html.response
 
+            touch(request.app, name)
+
             if request.path.endswith("/boot"):
-                await html(f"Killing, {name}...\n\n")
-                await html.maybe(await container.kill(), "ok\n")
-                await html(f"\nBooting, {name}...\n\n")
-                await html.maybe(await container.boot(), "ok\n")
+                # Booting is still worth a try if nothing was left to kill
+                steps = [
+                    (f"Killing, {name}...\n\n", container.kill, False),
+                    (f"\nBooting, {name}...\n\n", container.boot, True),
+                ]
             else:
-                await html(f"Starting, {name}...\n\n")
-                await html.maybe(await container.start(), "ok\n")
+                steps = [(f"Starting, {name}...\n\n", container.start, True)]
+
+            for message, action, required in steps:
+                await html(message)
+                try:
+                    output = await action()
+                except Exception as e:
+                    # e.g. timed out after command_timeout
+                    await html.maybe(str(e), "Error\n")
+                    return html.response
+                if output.returncode != 0:
+                    error = f"Exited with code {output.returncode}\n"
+                    await html.maybe(output + f"\n{error}".encode("utf-8"), error)
+                    if required:
+                        return html.response
+                    continue
+                await html.maybe(output, "ok\n")
 
             try:
-                async for log in container.logs(
-                    break_on={"running on": False, "exited with code": True}, tail=1
-                ):
-                    await html.maybe(log, ".")
+                async with aclosing(
+                    container.logs(
+                        break_on={"running on": False, "exited with code": True},
+                        tail=1,
+                    )
+                ) as logs:
+                    async for log in logs:
+                        await html.maybe(log, ".")
 
             except Exception as e:
                 await html.maybe(str(e), "Error")
@@ -2,6 +2,7 @@
 # @author Florian Mounier <florian.mounier@akretion.com>
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 from asyncio import gather
+from contextlib import aclosing
 
 from ..container import Container
 from ..html import Html
@@ -24,14 +25,16 @@ async def stop(request):
             await html(f"Stopping, {name}...\n\n")
 
             async def log():
-                async for log in container.logs(
-                    break_on={"exited with code": False}, tail=1
-                ):
-                    await html.maybe(log, ".")
+                async with aclosing(
+                    container.logs(break_on={"exited with code": False}, tail=1)
+                ) as logs:
+                    async for log in logs:
+                        await html.maybe(log, ".")
 
             async def stop():
-                async for log in (await container.stop(stream=True))():
-                    await html.maybe(log, ".")
+                async with aclosing((await container.stop(stream=True))()) as logs:
+                    async for log in logs:
+                        await html.maybe(log, ".")
 
             try:
                 await gather(log(), stop())
@@ -0,0 +1,93 @@
+# Copyright 2025 Akretion (http://www.akretion.com).
+# @author Florian Mounier <florian.mounier@akretion.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+from asyncio import Event, TimeoutError, wait_for
+from datetime import datetime, timedelta, UTC
+from heapq import heapify, heappop, heappush
+
+
+class Scheduler:
+    """Min-heap of per-project deadlines.
+
+    Rescheduling a project pushes a new heap entry and the stale ones are
+    skipped when popped, so every operation stays O(log n) amortized.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._deadlines = {}
+        self._changed = Event()
+        self._wake_at = None
+
+    def __contains__(self, name):
+        return name in self._deadlines
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __iter__(self):
+        return iter(list(self._deadlines))
+
+    def get(self, name):
+        return self._deadlines.get(name)
+
+    def schedule(self, name, deadline):
+        self._deadlines[name] = deadline
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            # Frequent postponing leaves many stale entries, drop them
+            self._heap = [(value, key) for key, value in self._deadlines.items()]
+            heapify(self._heap)
+        else:
+            heappush(self._heap, (deadline, name))
+        if self._wake_at is not None and deadline < self._wake_at:
+            # Wake the waiter up only if it now has to run sooner
+            self._changed.set()
+
+    def postpone(self, name, deadline):
+        """Push the deadline forward, never backward"""
+        current = self._deadlines.get(name)
+        if current is None or deadline > current:
+            self.schedule(name, deadline)
+
+    def discard(self, name):
+        self._deadlines.pop(name, None)
+
+    def _clean(self):
+        while self._heap:
+            deadline, name = self._heap[0]
+            if self._deadlines.get(name) == deadline:
+                return
+            heappop(self._heap)
+
+    @property
+    def next_deadline(self):
+        self._clean()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        now = now or datetime.now(UTC)
+        due = []
+        self._clean()
+        while self._heap and self._heap[0][0] <= now:
+            _, name = heappop(self._heap)
+            del self._deadlines[name]
+            due.append(name)
+            self._clean()
+        return due
+
+    async def wait(self, timeout):
+        """Sleep until the next deadline, at most `timeout` seconds"""
+        self._changed.clear()
+        now = datetime.now(UTC)
+        deadline = self.next_deadline
+        if deadline is not None:
+            timeout = min(timeout, max(0, (deadline - now).total_seconds()))
+        if timeout <= 0:
+            return
+        self._wake_at = now + timedelta(seconds=timeout)
+        try:
+            await wait_for(self._changed.wait(), timeout)
+        except TimeoutError:
+            pass
+        finally:
+            self._wake_at = None
@@ -0,0 +1,473 @@
+# Copyright 2025 Akretion (http://www.akretion.com).
+# @author Florian Mounier <florian.mounier@akretion.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+"""Replay recorded access traces against stop_inactive / remove_obsolete settings.
+
+Extract a trace from the compose logs (of the running docker host or of
+saved `docker compose -p <name> logs --no-color` files named after the
+project), then sweep candidate settings over it:
+
+    python -m bootemup.simulator extract > trace.jsonl
+    python -m bootemup.simulator run trace.jsonl \\
+        --inactive-threshold 300 900 1800 --obsolete-threshold 864000 1728000
+"""
+
+import json
+import os
+import pathlib
+import re
+import sys
+from argparse import ArgumentParser
+from asyncio import run as run_async
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, UTC
+from itertools import product
+from math import floor
+from statistics import median
+
+from .config import config
+from .container import access_re, get_containers, line_re, startup_re
+from .tasks.remove_obsolete import is_managed as is_removable
+from .tasks.stop_inactive import is_managed as is_stoppable
+from .utils import run
+
+
+boot_marker_re = re.compile(r".* Odoo version ")
+size_re = re.compile(r"(?P<value>[\d.]+)\s*(?P<unit>[kMGTP]?B)")
+size_units = {"B": 1, "kB": 1e3, "MB": 1e6, "GB": 1e9, "TB": 1e12, "PB": 1e15}
+
+
+def parse_log(name, lines, boot_gap=60):
+    exclude_urls = [re.compile(rex) for rex in config["stop_inactive"]["exclude_urls"]]
+    # Per service timestamp of the beginning of the current boot: the first
+    # line of the server or, when it is not logged, the first line after a
+    # silence of at least `boot_gap` seconds
+    boot_start = {}
+    last_line = {}
+    for line in lines:
+        match = line_re.match(line)
+        if not match:
+            continue
+        service = match.group("service")
+        timestamp = (
+            datetime.fromisoformat(match.group("timestamp"))
+            .replace(tzinfo=UTC)
+            .timestamp()
+        )
+        previous = last_line.get(service)
+        last_line[service] = timestamp
+        if (
+            boot_marker_re.match(line)
+            or previous is None
+            or timestamp - previous >= boot_gap
+        ):
+            boot_start[service] = timestamp
+
+        match = startup_re.match(line)
+        if match:
+            if service in boot_start:
+                yield {
+                    "project": name,
+                    "type": "boot",
+                    "time": timestamp,
+                    "duration": timestamp - boot_start.pop(service),
+                }
+            continue
+
+        match = access_re.match(line)
+        if match:
+            boot_start.pop(service, None)
+            if any(rex.match(match.group("url")) for rex in exclude_urls):
+                continue
+            yield {"project": name, "type": "access", "time": timestamp}
+
+
+def parse_size(size):
+    """Parse a docker ps size like "12.3kB (virtual 1.2GB)" into bytes"""
+    return [
+        round(float(match.group("value")) * size_units[match.group("unit")])
+        for match in size_re.finditer(size or "")
+    ]
+
+
+async def project_sizes():
+    """Disk size of each project: its containers writable layers and images"""
+    stdout = await run("docker", "ps", "--all", "--size", "--format", "json")
+    sizes = defaultdict(int)
+    images = defaultdict(dict)
+    for line in stdout.decode("utf-8").split("\n"):
+        if not line:
+            continue
+        container = json.loads(line)
+        project = next(
+            (
+                label.split("=", 1)[1]
+                for label in container["Labels"].split(",")
+                if label.startswith("com.docker.compose.project=")
+            ),
+            None,
+        )
+        if project is None:
+            continue
+        writable, *virtual = parse_size(container["Size"]) or [0]
+        sizes[project] += writable
+        if virtual:
+            # Virtual size includes the image, count each image once
+            images[project][container["Image"]] = virtual[0] - writable
+    return {
+        project: size + sum(images[project].values()) for project, size in sizes.items()
+    }
+
+
+async def extract_live(boot_gap):
+    events = []
+    sizes = await project_sizes()
+    for container in await get_containers():
+        stdout = await run("docker", "compose", "-p", container.name, "logs")
+        events.extend(
+            parse_log(container.name, stdout.decode("utf-8").split("\n"), boot_gap)
+        )
+        # The tasks leave projects without their label alone
+        events.append(
+            {
+                "project": container.name,
+                "type": "policy",
+                "time": 0,
+                "stop_inactive": is_stoppable(container),
+                "remove_obsolete": is_removable(container),
+            }
+        )
+        if container.name in sizes:
+            events.append(
+                {
+                    "project": container.name,
+                    "type": "size",
+                    "time": 0,
+                    "bytes": sizes[container.name],
+                }
+            )
+    return events
+
+
+def extract(args):
+    if args.logs:
+        events = []
+        for path in map(pathlib.Path, args.logs):
+            with path.open(encoding="utf-8", errors="replace") as f:
+                events.extend(parse_log(path.stem, f, args.boot_gap))
+    else:
+        events = run_async(extract_live(args.boot_gap))
+
+    events.sort(key=lambda event: event["time"])
+    for event in events:
+        print(json.dumps(event))
+
+
+def load(paths, default_boot, default_size):
+    accesses = defaultdict(lambda: defaultdict(int))
+    boots = defaultdict(list)
+    sizes = {}
+    # Projects of traces extracted from saved logs are assumed managed
+    policies = defaultdict(lambda: (True, True))
+
+    def read(f):
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            name = event["project"]
+            if event["type"] == "access":
+                # Logs have a second resolution, group hits by second
+                accesses[name][floor(event["time"])] += 1
+            elif event["type"] == "boot":
+                boots[name].append(event["duration"])
+            elif event["type"] == "size":
+                sizes[name] = event["bytes"]
+            elif event["type"] == "policy":
+                policies[name] = (event["stop_inactive"], event["remove_obsolete"])
+
+    for path in paths:
+        if path == "-":
+            # Leave stdin open
+            read(sys.stdin)
+            continue
+        with open(path, encoding="utf-8") as f:
+            read(f)
+
+    missing = (accesses.keys() | boots.keys()) - sizes.keys()
+    if missing and default_size is None:
+        raise ValueError(
+            f"No size event for {len(missing)} project(s), "
+            "use extract on the docker host or give --disk-size"
+        )
+
+    projects = []
+    for name in accesses.keys() | boots.keys() | sizes.keys() | policies.keys():
+        hits = sorted(accesses[name].items())
+        times = [time for time, _ in hits]
+        # Prefix sums of hits and hits * time, to sum waits over a window
+        hit_sums, weighted_sums = [0], [0]
+        for time, count in hits:
+            hit_sums.append(hit_sums[-1] + count)
+            weighted_sums.append(weighted_sums[-1] + count * time)
+        # Indexes of accesses sorted by the idle gap preceding them: for a
+        # given inactive_threshold the stack can only have been stopped before
+        # the accesses in the tail of this list
+        by_gap = sorted(range(1, len(times)), key=lambda i: times[i] - times[i - 1])
+        projects.append(
+            (
+                times,
+                hit_sums,
+                weighted_sums,
+                by_gap,
+                [times[i] - times[i - 1] for i in by_gap],
+                median(boots[name]) if boots[name] else default_boot,
+                sizes.get(name, default_size),
+                *policies[name],
+            )
+        )
+    times = [time for project_times, *_ in projects for time in project_times]
+    return projects, min(times, default=0), max(times, default=0)
+
+
+def simulate(projects, start, end, settings):
+    """Replay the trace for one set of settings
+
+    Every project is assumed to be stopped, but present, at the start of the
+    trace. Deadlines are the ones the scheduler would use: a running project
+    is stopped `inactive_threshold` after its last access, but not before
+    the inventory refresh that discovers it, and a stopped one is removed
+    `obsolete_threshold` after it stopped. Projects without the label of a
+    task are never stopped, or removed, by it.
+
+    Only the accesses following a long enough gap are visited, so a run
+    costs O(cold starts * log(accesses)) per project.
+    """
+    inactive_threshold, check_interval, obsolete_threshold, obsolete_interval = settings
+
+    def tick(time, interval):
+        return start + (floor((time - start) / interval) + 1) * interval
+
+    def removal(stopped_at, removable):
+        if not removable:
+            return float("inf")
+        return max(stopped_at + obsolete_threshold, tick(stopped_at, obsolete_interval))
+
+    cold_starts = wait = lost = removals = 0
+    disk_seconds = final_disk = 0
+    runs = []
+
+    for (
+        times,
+        hit_sums,
+        weighted_sums,
+        by_gap,
+        gaps,
+        boot,
+        size,
+        stoppable,
+        removable,
+    ) in projects:
+        candidates = (
+            sorted(by_gap[bisect_left(gaps, inactive_threshold) :]) if stoppable else []
+        )
+        candidate = 0
+        stopped_at = start
+        i = 0
+        while i < len(times):
+            started = times[i]
+            removed_at = removal(stopped_at, removable)
+            if started >= removed_at:
+                removals += 1
+                disk_seconds += size * (removed_at - start)
+                lost += hit_sums[-1] - hit_sums[i]
+                break
+
+            cold_starts += 1
+            ready = started + boot
+            discovered = tick(started, check_interval)
+
+            while candidate < len(candidates) and candidates[candidate] <= i:
+                candidate += 1
+            following = len(times)
+            while candidate < len(candidates):
+                j = candidates[candidate]
+                candidate += 1
+                if times[j] >= discovered:
+                    following = j
+                    break
+
+            booting = bisect_left(times, ready, i, following)
+            wait += ready * (hit_sums[booting] - hit_sums[i]) - (
+                weighted_sums[booting] - weighted_sums[i]
+            )
+
+            stopped_at = max(times[following - 1] + inactive_threshold, discovered)
+            if following == len(times):
+                stopped_at = min(stopped_at, end) if stoppable else end
+            runs.append((started, stopped_at))
+            i = following
+        else:
+            removed_at = removal(stopped_at, removable)
+            if removed_at <= end:
+                removals += 1
+                disk_seconds += size * (removed_at - start)
+            else:
+                final_disk += size
+                disk_seconds += size * (end - start)
+
+    events = sorted(
+        [(started, 1) for started, _ in runs] + [(stopped, -1) for _, stopped in runs]
+    )
+    concurrent = peak = 0
+    for _, delta in events:
+        concurrent += delta
+        peak = max(peak, concurrent)
+    stack_seconds = sum(stopped - started for started, stopped in runs)
+
+    duration = max(end - start, 1)
+    return {
+        "inactive_threshold": inactive_threshold,
+        "check_interval": check_interval,
+        "obsolete_threshold": obsolete_threshold,
+        "obsolete_check_interval": obsolete_interval,
+        "cold_starts": cold_starts,
+        "wait": round(wait, 1),
+        "lost_accesses": lost,
+        "peak_stacks": peak,
+        "mean_stacks": round(stack_seconds / duration, 2),
+        "removals": removals,
+        "mean_disk": round(disk_seconds / duration),
+        "final_disk": final_disk,
+    }
+
+
+_trace = None
+
+
+def _load_trace(*trace):
+    global _trace
+    _trace = trace
+
+
+def _simulate(settings):
+    return simulate(*_trace, settings)
+
+
+def sweep(args):
+    try:
+        projects, start, end = load(args.traces, args.boot_duration, args.disk_size)
+    except ValueError as e:
+        sys.exit(str(e))
+    print(
+        f"Replaying {len(projects)} projects over {(end - start) / 86400:.1f} days",
+        file=sys.stderr,
+    )
+    settings = list(
+        product(
+            args.inactive_threshold,
+            args.check_interval,
+            args.obsolete_threshold,
+            args.obsolete_check_interval,
+        )
+    )
+
+    jobs = args.jobs or os.cpu_count()
+    # Ship the trace once per worker rather than once per setting
+    with ProcessPoolExecutor(
+        jobs, initializer=_load_trace, initargs=(projects, start, end)
+    ) as executor:
+        results = list(
+            executor.map(
+                _simulate, settings, chunksize=max(1, len(settings) // (jobs * 4))
+            )
+        )
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+
+    ranked = sorted(results, key=lambda result: (result["wait"], result["mean_stacks"]))
+    keys = list(ranked[0]) if ranked else []
+    print("\t".join(keys))
+    for result in ranked:
+        print("\t".join(str(result[key]) for key in keys))
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog="python -m bootemup.simulator",
+        description="Replay access traces against idle/evict settings",
+    )
+    commands = parser.add_subparsers(required=True)
+
+    parser_extract = commands.add_parser(
+        "extract", help="Extract a JSON lines trace from compose logs"
+    )
+    parser_extract.add_argument(
+        "logs",
+        nargs="*",
+        help="Saved `docker compose logs` files named <project>.log "
+        "(defaults to the logs of every project on this host)",
+    )
+    parser_extract.add_argument(
+        "--boot-gap",
+        type=float,
+        default=60,
+        help="Silence (seconds) after which a log line is taken as a boot start, "
+        "when the server does not log its version",
+    )
+    parser_extract.set_defaults(command=extract)
+
+    parser_run = commands.add_parser("run", help="Sweep settings over traces")
+    parser_run.add_argument("traces", nargs="+", help="Trace files (- for stdin)")
+    parser_run.add_argument(
+        "--inactive-threshold",
+        type=float,
+        nargs="+",
+        default=[config["stop_inactive"]["inactive_threshold"]],
+    )
+    parser_run.add_argument(
+        "--check-interval",
+        type=float,
+        nargs="+",
+        default=[config["stop_inactive"]["check_interval"]],
+    )
+    parser_run.add_argument(
+        "--obsolete-threshold",
+        type=float,
+        nargs="+",
+        default=[config["remove_obsolete"]["obsolete_threshold"]],
+    )
+    parser_run.add_argument(
+        "--obsolete-check-interval",
+        type=float,
+        nargs="+",
+        default=[config["remove_obsolete"]["check_interval"]],
+    )
+    parser_run.add_argument(
+        "--boot-duration",
+        type=float,
+        default=30,
+        help="Boot duration for projects without recorded boots (seconds)",
+    )
+    parser_run.add_argument(
+        "--disk-size",
+        type=int,
+        default=None,
+        help="Disk size of projects without a size event (bytes), "
+        "required when some projects have none",
+    )
+    parser_run.add_argument("--jobs", type=int, default=None)
+    parser_run.add_argument("--json", action="store_true")
+    parser_run.set_defaults(command=sweep)
+
+    args = parser.parse_args(argv)
+    args.command(args)
+
+
+if __name__ == "__main__":
+    main()
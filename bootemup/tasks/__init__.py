@@ -4,3 +4,6 @@
 
 from .remove_obsolete import remove_obsolete as remove_obsolete
 from .stop_inactive import stop_inactive as stop_inactive
+from .collect_activity import collect_activity as collect_activity
+from .refresh_index import refresh_index as refresh_index
+from .ingest_traefik import ingest_traefik as ingest_traefik
@@ -0,0 +1,44 @@
+# Copyright 2025 Akretion (http://www.akretion.com).
+# @author Florian Mounier <florian.mounier@akretion.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+from aiohttp.web import AppKey
+from asyncio import Task, create_task, CancelledError, sleep
+from contextlib import suppress
+from traceback import print_exc
+
+from ..activity import Collector
+from ..config import config
+
+
+async def loop(app):
+    interval = config["activity"]["sample_interval"]
+    collector = app[activity_collector]
+    print(f"Scheduling collect_activity task every {interval}s")
+
+    while True:
+        try:
+            # Only the projects stop_inactive may stop need sampling, reuse
+            # its inventory instead of polling docker once more
+            if activity_containers in app:
+                collector.sample(list(app[activity_containers].values()))
+        except Exception:
+            print("Error in collect_activity task:")
+            print_exc()
+
+        await sleep(interval)
+
+
+activity_collector = AppKey("activity_collector", Collector)
+activity_containers = AppKey("activity_containers", dict)
+collect_activity_listener = AppKey("collect_activity", Task[None])
+
+
+async def collect_activity(app):
+    app[activity_collector] = Collector()
+    app[collect_activity_listener] = create_task(loop(app))
+
+    yield
+
+    app[collect_activity_listener].cancel()
+    with suppress(CancelledError):
+        await app[collect_activity_listener]
@@ -0,0 +1,68 @@
+# Copyright 2025 Akretion (http://www.akretion.com).
+# @author Florian Mounier <florian.mounier@akretion.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+from aiohttp.web import AppKey
+from asyncio import Task, create_task, CancelledError, sleep
+from contextlib import suppress
+from datetime import datetime, UTC
+from traceback import print_exc
+
+from ..config import config
+from ..container import get_containers, url_routes
+from ..traefik import TraefikAccessLog
+from .stop_inactive import touch
+
+
+async def loop(app):
+    settings = config["traefik"]
+    interval = settings["poll_interval"]
+    access_log = app[traefik_access_log]
+    routes = []
+    refreshed = None
+    unknown = set()
+    print(f"Following {settings['access_log']} every {interval}s")
+
+    while True:
+        try:
+            if (
+                refreshed is None
+                or (datetime.now(UTC) - refreshed).total_seconds()
+                > settings["refresh_interval"]
+            ):
+                routes = url_routes(await get_containers())
+                refreshed = datetime.now(UTC)
+                unknown = set()
+
+            while (result := access_log.read(routes)) is not None:
+                accesses, hosts = result
+                for name, when, url in accesses:
+                    touch(app, name, when, url)
+                if hosts - unknown:
+                    # Maybe a new project, refresh the routes on next poll
+                    unknown |= hosts
+                    refreshed = None
+                # Let other tasks run while catching up on a long log
+                await sleep(0)
+        except Exception:
+            print("Error in ingest_traefik task:")
+            print_exc()
+
+        await sleep(interval)
+
+
+traefik_access_log = AppKey("traefik_access_log", TraefikAccessLog)
+ingest_traefik_listener = AppKey("ingest_traefik", Task[None])
+
+
+async def ingest_traefik(app):
+    app[traefik_access_log] = TraefikAccessLog(
+        config["traefik"]["access_log"], config["traefik"]["routers"]
+    )
+    app[ingest_traefik_listener] = create_task(loop(app))
+
+    yield
+
+    app[ingest_traefik_listener].cancel()
+    with suppress(CancelledError):
+        await app[ingest_traefik_listener]
+    app[traefik_access_log].follower.close()
@@ -0,0 +1,21 @@
+# Copyright 2025 Akretion (http://www.akretion.com).
+# @author Florian Mounier <florian.mounier@akretion.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+from aiohttp.web import AppKey
+
+from ..index import Index
+
+
+dashboard_index = AppKey("dashboard_index", Index)
+
+
+async def refresh_index(app):
+    # Nothing runs in the background, the dashboard refreshes what it shows
+    app[dashboard_index] = Index()
+
+    yield
+
+    index = app[dashboard_index]
+    for task in [index.refreshing, *index.computing.values()]:
+        if task is not None:
+            task.cancel()
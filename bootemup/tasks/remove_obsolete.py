@@ -2,51 +2,92 @@
 # @author Florian Mounier <florian.mounier@akretion.com>
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 from aiohttp.web import AppKey
-from asyncio import Task, create_task, CancelledError, sleep
+from asyncio import Task, create_task, CancelledError
 from contextlib import suppress
-from datetime import datetime, UTC
+from datetime import datetime, timedelta, UTC
 from traceback import print_exc
 
 
 from ..config import config
 from ..container import get_containers
+from ..scheduler import Scheduler
+
+
+def is_managed(container):
+    return container.has_stop_inactive_label
+
+
+def is_candidate(container):
+    return is_managed(container) and "running" not in container.status
+
+
+async def check(container, scheduler):
+    threshold = config["remove_obsolete"]["obsolete_threshold"]
+
+    await container.get_last_activity()
+    if container.last_activity is None or container.last_activity == "running":
+        # Restarted in the meantime, the inventory refresh will pick it up again
+        return
+
+    now = datetime.now(UTC)
+    age = (now - container.last_activity).total_seconds()
+    if age >= threshold:
+        print(f"Removing {container.name} (inactive for {age} seconds)")
+        output = await container.rm()
+        if output.returncode != 0:
+            print(
+                f"Failed to remove {container.name} (exit code {output.returncode}):\n"
+                f"{output.decode('utf-8', errors='replace')}"
+            )
+            # Try again at the next interval
+            scheduler.schedule(
+                container.name,
+                now + timedelta(seconds=config["remove_obsolete"]["check_interval"]),
+            )
+        return
+
+    scheduler.schedule(
+        container.name, container.last_activity + timedelta(seconds=threshold)
+    )
 
 
 async def loop(app):
     interval = config["remove_obsolete"]["check_interval"]
-    print(f"Scheduling remove_obsolete task every {interval}s")
+    scheduler = app[remove_obsolete_scheduler]
+    print(f"Scheduling remove_obsolete task, inventory refreshed every {interval}s")
 
     while True:
         try:
-            print("Running remove_obsolete task")
-            containers = await get_containers()
-            for container in containers:
-                if (
-                    not container.has_stop_inactive_label
-                    or "running" in container.status
-                ):
-                    continue
-
-                await container.get_last_activity()
-                if (
-                    container.last_activity is not None
-                    and container.last_activity != "running"
-                ):
-                    age = (datetime.now(UTC) - container.last_activity).total_seconds()
-                    if age > config["remove_obsolete"]["obsolete_threshold"]:
-                        print(f"Removing {container.name} (inactive for {age} seconds)")
-                        await container.rm()
+            containers = {
+                container.name: container
+                for container in await get_containers()
+                if is_candidate(container)
+            }
+            for name in scheduler:
+                if name not in containers:
+                    scheduler.discard(name)
+            for name in containers:
+                if name not in scheduler:
+                    scheduler.schedule(name, datetime.now(UTC))
+
+            due = scheduler.pop_due()
+            if due:
+                print(f"Running remove_obsolete task on {len(due)} project(s)")
+            for name in due:
+                await check(containers[name], scheduler)
         except Exception:
-            print("Error in stop_inactive task:")
+            print("Error in remove_obsolete task:")
             print_exc()
 
-        await sleep(interval)
+        await scheduler.wait(interval)
 
 
+remove_obsolete_scheduler = AppKey("remove_obsolete_scheduler", Scheduler)
 remove_obsolete_listener = AppKey("remove_obsolete", Task[None])
 
 
 async def remove_obsolete(app):
+    app[remove_obsolete_scheduler] = Scheduler()
     app[remove_obsolete_listener] = create_task(loop(app))
 
     yield
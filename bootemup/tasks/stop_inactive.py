@@ -2,50 +2,219 @@
 # @author Florian Mounier <florian.mounier@akretion.com>
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 from aiohttp.web import AppKey
-from asyncio import Task, create_task, CancelledError, sleep
+from asyncio import Task, create_task, CancelledError
 from contextlib import suppress
-from datetime import datetime, UTC
+from datetime import datetime, timedelta, UTC
 from traceback import print_exc
 
+from ..access import last_accesses
 from ..config import config
 from ..container import get_containers
+from ..memory import Memory, usage as memory_usage
+from ..scheduler import Scheduler
+from .collect_activity import activity_collector, activity_containers
+
+
+def is_managed(container):
+    return container.has_remove_obsolete_label
+
+
+def is_candidate(container):
+    return is_managed(container) and "running" in container.status
+
+
+def recent_activity(app, container):
+    """Last access or resource activity known without reading logs"""
+    last_active = None
+    if activity_collector in app:
+        last_active = app[activity_collector].last_active.get(container.name)
+    last_seen, _ = last_accesses.get(container.name)
+    return max(filter(None, (last_active, last_seen)), default=None)
+
+
+async def logged_access(container):
+    await container.get_last_access()
+    if isinstance(container.last_access, datetime):
+        # Seed the table, so that it's enough for the next checks
+        last_accesses.touch(container.name, container.last_access)
+        return container.last_access
+
+
+def inactive_threshold(memory):
+    if memory is not None and memory.plentiful:
+        # Plenty of RAM, keep idle projects around longer
+        return config["memory"]["max_inactive_threshold"]
+    return config["stop_inactive"]["inactive_threshold"]
+
+
+async def check(app, container, scheduler, memory=None):
+    """Stop `container` if idle, or schedule its next check, True if stopped"""
+    threshold = inactive_threshold(memory)
+    now = datetime.now(UTC)
+
+    def deadline(last):
+        deadline = last + timedelta(seconds=threshold)
+        soft = last + timedelta(seconds=config["stop_inactive"]["inactive_threshold"])
+        if deadline > soft:
+            # Past the soft limit, look again once memory may have changed
+            recheck = now + timedelta(seconds=config["stop_inactive"]["check_interval"])
+            deadline = min(deadline, max(soft, recheck))
+        return deadline
+
+    recent = recent_activity(app, container)
+    if recent and (now - recent).total_seconds() < threshold:
+        # Still busy, no need to look at the logs yet
+        scheduler.schedule(container.name, deadline(recent))
+        return False
+
+    last_logged = None
+    last_seen, _ = last_accesses.get(container.name)
+    if config["stop_inactive"]["read_logs"] or last_seen is None:
+        last_logged = await logged_access(container)
+    if last_logged is None and last_seen is None:
+        # Nothing to base a deadline on, look again at the next interval
+        scheduler.schedule(
+            container.name,
+            now + timedelta(seconds=config["stop_inactive"]["check_interval"]),
+        )
+        return False
+
+    # Idle only if both accesses and resource usage are
+    last = max(filter(None, (last_logged, recent)))
+    age = (now - last).total_seconds()
+    if age >= threshold:
+        print(f"Stopping {container.name} (inactive for {age} seconds)")
+        output = await container.stop()
+        if output.returncode != 0:
+            print(
+                f"Failed to stop {container.name} (exit code {output.returncode}):\n"
+                f"{output.decode('utf-8', errors='replace')}"
+            )
+            # Try again at the next interval
+            scheduler.schedule(
+                container.name,
+                now + timedelta(seconds=config["stop_inactive"]["check_interval"]),
+            )
+            return False
+        return True
+
+    scheduler.schedule(container.name, deadline(last))
+    return False
+
+
+async def relieve(app, containers, scheduler, memory):
+    """Stop the least recently accessed projects until memory is back"""
+    minimum = config["memory"]["min_inactive_threshold"]
+    now = datetime.now(UTC)
+
+    candidates = []
+    for container in containers.values():
+        # Reading logs here would be too slow for the check interval under
+        # pressure, projects with no known access are left to check()
+        last = recent_activity(app, container)
+        if last is None or (now - last).total_seconds() < minimum:
+            continue
+        candidates.append((last, container))
+    candidates.sort(key=lambda candidate: candidate[0])
+
+    freed = 0
+    for last, container in candidates:
+        used = memory_usage(container)
+        age = (now - last).total_seconds()
+        print(
+            f"Stopping {container.name} early under memory pressure "
+            f"(inactive for {age} seconds, using {used or 'unknown'} bytes)"
+        )
+        output = await container.stop()
+        if output.returncode != 0:
+            print(
+                f"Failed to stop {container.name} (exit code {output.returncode}):\n"
+                f"{output.decode('utf-8', errors='replace')}"
+            )
+            continue
+        scheduler.discard(container.name)
+        del containers[container.name]
+        freed += used
+        if not used or not memory.missing or freed >= memory.missing:
+            # Pressure stall figures lag and usage may be unknown (no
+            # readable memory.current), free one project at a time then
+            break
 
 
 async def loop(app):
     interval = config["stop_inactive"]["check_interval"]
-    print(f"Scheduling stop_inactive task every {interval}s")
+    memory_aware = config["memory"]["enabled"]
+    wake_interval = config["memory"]["check_interval"] if memory_aware else interval
+    scheduler = app[stop_inactive_scheduler]
+    # Shared with collect_activity, hence updated in place
+    containers = app[activity_containers]
+    refreshed = None
+    print(f"Scheduling stop_inactive task, inventory refreshed every {interval}s")
 
     while True:
         try:
-            print("Running stop_inactive task")
-            containers = await get_containers()
-            for container in containers:
-                if (
-                    not container.has_remove_obsolete_label
-                    or "running" not in container.status
-                ):
-                    continue
-
-                await container.get_last_access()
-                if (
-                    container.last_access is not None
-                    and container.last_access != "never"
-                ):
-                    age = (datetime.now(UTC) - container.last_access).total_seconds()
-                    if age > config["stop_inactive"]["inactive_threshold"]:
-                        print(f"Stopping {container.name} (inactive for {age} seconds)")
-                        await container.stop()
+            now = datetime.now(UTC)
+            if (
+                refreshed is None
+                or (now - refreshed).total_seconds() >= interval
+                or (scheduler.next_deadline or now) < now
+            ):
+                candidates = [
+                    container
+                    for container in await get_containers()
+                    if is_candidate(container)
+                ]
+                containers.clear()
+                containers.update(
+                    (container.name, container) for container in candidates
+                )
+                refreshed = now
+                for name in scheduler:
+                    if name not in containers:
+                        scheduler.discard(name)
+                for name in containers:
+                    if name not in scheduler:
+                        # New project, check it right away to get its deadline
+                        scheduler.schedule(name, now)
+
+            memory = Memory() if memory_aware else None
+            if memory is not None and memory.under_pressure:
+                await relieve(app, containers, scheduler, memory)
+
+            due = scheduler.pop_due()
+            if due:
+                print(f"Running stop_inactive task on {len(due)} project(s)")
+            for name in due:
+                if name in containers:
+                    if await check(app, containers[name], scheduler, memory):
+                        # Not a candidate anymore, for relieve and the collector
+                        del containers[name]
         except Exception:
             print("Error in stop_inactive task:")
             print_exc()
 
-        await sleep(interval)
+        await scheduler.wait(wake_interval)
+
+
+def touch(app, name, when=None, url=None):
+    """Record an access to `name`, postponing its inactivity deadline"""
+    when = when or datetime.now(UTC)
+    if not last_accesses.touch(name, when, url):
+        return
+    if stop_inactive_scheduler not in app:
+        return
+    app[stop_inactive_scheduler].postpone(
+        name, when + timedelta(seconds=config["stop_inactive"]["inactive_threshold"])
+    )
 
 
+stop_inactive_scheduler = AppKey("stop_inactive_scheduler", Scheduler)
 stop_inactive_listener = AppKey("stop_inactive", Task[None])
 
 
 async def stop_inactive(app):
+    app[stop_inactive_scheduler] = Scheduler()
+    app[activity_containers] = {}
     app[stop_inactive_listener] = create_task(loop(app))
 
     yield
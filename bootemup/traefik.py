@@ -0,0 +1,107 @@
+# Copyright 2025 Akretion (http://www.akretion.com).
+# @author Florian Mounier <florian.mounier@akretion.com>
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+import json
+import os
+import re
+from datetime import datetime, UTC
+
+from .container import match_route
+
+
+class LogFollower:
+    """Read a log file incrementally, across rotations and truncations"""
+
+    def __init__(self, path, chunk_size=1 << 20):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.file = None
+        self.inode = None
+        self.partial = b""
+
+    @property
+    def offset(self):
+        return self.file.tell() if self.file else 0
+
+    def close(self):
+        if self.file:
+            self.file.close()
+        self.file = None
+
+    def _open(self):
+        try:
+            self.file = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        self.inode = os.fstat(self.file.fileno()).st_ino
+        self.partial = b""
+        return True
+
+    def _rotated(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return stat.st_ino != self.inode or stat.st_size < self.offset
+
+    def read(self):
+        """Return the next complete lines, at most about `chunk_size` bytes"""
+        if self.file is None and not self._open():
+            return []
+
+        data = self.file.read(self.chunk_size)
+        if not data and self._rotated():
+            # The old file has been read to its end, switch to the new one
+            self.close()
+            if not self._open():
+                return []
+            data = self.file.read(self.chunk_size)
+
+        lines = (self.partial + data).split(b"\n")
+        self.partial = lines.pop()
+        return lines
+
+
+class TraefikAccessLog:
+    """Map traefik JSON access log entries to (project, time, url)"""
+
+    def __init__(self, path, routers):
+        self.follower = LogFollower(path)
+        self.routers = [(re.compile(rex), name) for rex, name in routers.items()]
+
+    def project(self, entry, routes):
+        router = entry.get("RouterName") or ""
+        for rex, name in self.routers:
+            if rex.match(router):
+                return rex.sub(name, router)
+        return match_route(
+            routes, entry.get("RequestHost"), entry.get("RequestPath") or "/"
+        )
+
+    def read(self, routes):
+        """Return accesses and unmatched hosts of the next lines, None at EOF"""
+        lines = self.follower.read()
+        if not lines:
+            return None
+
+        accesses = []
+        unknown = set()
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict):
+                continue
+            name = self.project(entry, routes)
+            if name is None:
+                unknown.add(entry.get("RequestHost"))
+                continue
+            try:
+                when = datetime.fromisoformat(entry.get("StartUTC") or entry["time"])
+            except (KeyError, TypeError, ValueError):
+                when = datetime.now(UTC)
+            if when.tzinfo is None:
+                when = when.replace(tzinfo=UTC)
+            accesses.append((name, when, entry.get("RequestPath") or "/"))
+        return accesses, unknown
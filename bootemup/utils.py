@@ -2,34 +2,130 @@
 # @author Florian Mounier <florian.mounier@akretion.com>
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
+from asyncio import Semaphore, TimeoutError, get_running_loop, shield, wait_for
 from asyncio.subprocess import create_subprocess_exec, PIPE, STDOUT
+from contextlib import asynccontextmanager
+from datetime import datetime, UTC
 
 from .config import config
 
 
+class Output(bytes):
+    """Command output, along with its exit status"""
+
+    returncode = None
+
+
+class Command:
+    def __init__(self, args, process, timeout):
+        self.args = args
+        self.process = process
+        self.timeout = timeout
+        self.started = datetime.now(UTC)
+        self.timed_out = False
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    @property
+    def age(self):
+        return (datetime.now(UTC) - self.started).total_seconds()
+
+    def __str__(self):
+        return " ".join(self.args)
+
+    def expire(self):
+        self.timed_out = True
+        self.process.kill()
+
+
+class Executor:
+    """Spawn subprocesses with a concurrency cap and deadlines
+
+    Children are terminated when leaving the `spawn` context, whether the
+    command is done or the awaiting coroutine has been cancelled.
+    Long-lived commands paced by a client, log followers and exports, get
+    their own pool so that they never starve the short commands the
+    inventory and background tasks need.
+    """
+
+    def __init__(self, max_processes, max_followers, timeout):
+        self.semaphore = Semaphore(max_processes)
+        self.followers = Semaphore(max_followers)
+        self.timeout = timeout
+        self.commands = {}
+
+    @asynccontextmanager
+    async def spawn(self, *args, timeout=None, follow=False):
+        async with self.followers if follow else self.semaphore:
+            process = await create_subprocess_exec(
+                *args,
+                stdout=PIPE,
+                stderr=STDOUT,
+            )
+            command = Command(args, process, timeout)
+            self.commands[process.pid] = command
+            handle = (
+                get_running_loop().call_later(timeout, command.expire)
+                if timeout
+                else None
+            )
+            try:
+                yield command
+            finally:
+                if handle:
+                    handle.cancel()
+                if process.returncode is None:
+                    # Shielded so that a cancelled caller still reaps its child
+                    await shield(self._terminate(process))
+                del self.commands[process.pid]
+
+    async def _terminate(self, process):
+        process.terminate()
+        try:
+            await wait_for(process.wait(), 5)
+        except TimeoutError:
+            process.kill()
+            await process.wait()
+
+
+executor = Executor(
+    config["server"]["max_processes"],
+    config["server"]["max_followers"],
+    config["server"]["command_timeout"],
+)
+
+
 async def run(*args, stream=False):
     if config["server"]["dry_run"]:
         if args[0] == "docker" and args[1] == "compose":
             args = args[:2] + ("--dry-run",) + args[2:]
             print(" ".join(args))
 
-    process = await create_subprocess_exec(
-        *args,
-        stdout=PIPE,
-        stderr=STDOUT,
-    )
     if not stream:
-        stdout, _ = await process.communicate()
-        return stdout
+        async with executor.spawn(*args, timeout=executor.timeout) as command:
+            stdout, _ = await command.process.communicate()
+        if command.timed_out:
+            raise ValueError(f"Timed out after {command.timeout}s: {command}")
+        output = Output(stdout)
+        output.returncode = command.process.returncode
+        return output
 
     async def stream():
-        while True:
-            stdout = await process.stdout.read(256)
-            if stdout:
-                yield stdout
-            else:
-                if process.returncode is not None and process.returncode != 0:
-                    raise ValueError(f"Exited with code {process.returncode}")
-                break
+        async with executor.spawn(*args, timeout=executor.timeout) as command:
+            while True:
+                stdout = await command.process.stdout.read(256)
+                if stdout:
+                    yield stdout
+                else:
+                    await command.process.wait()
+                    if command.timed_out:
+                        raise ValueError(f"Timed out after {command.timeout}s")
+                    if command.process.returncode != 0:
+                        raise ValueError(
+                            f"Exited with code {command.process.returncode}"
+                        )
+                    break
 
     return stream